@@ -1,25 +1,37 @@
 # Copyright © 2025, Alexander Suvorov
+import argparse
 import time
 import json
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
+import shutil
 import sys
-
-from .core import HMAC_DRBG, encrypt_decrypt
-from .database import CLMDatabase
+import zlib
+
+from .core import (CODEC_NONE, POINTER_VERSION_TAGGED, chat_keystream, compress_message, decompress_message,
+                   encrypt_decrypt, pointer_codec_and_tag, pointer_tag, verify_pointer_tag)
+from .database import SYNCHRONOUS_LEVELS, BackgroundDeleter, CLMDatabase, MessageWriteError
+from .discovery import discover
+from .pads import DEFAULT_PAD_LENGTH, KeystreamPads
+from .sync import merge_databases
+from .stream import decrypt_file, encrypt_file, new_header, read_header
+from .profiles import DEFAULT_PROFILE, ProfileRouter, profile_dir
 from .auth import AuthManager
 
 
 class ChronoLibrarianCLI:
-    def __init__(self):
-        self.config_dir = Path.home() / ".config" / "clm"
+    def __init__(self, config_dir: Optional[Path] = None):
+        self.config_dir = Path(config_dir) if config_dir else profile_dir()
         self.config_dir.mkdir(parents=True, exist_ok=True)
         self.db = CLMDatabase(self.config_dir / "clm.db")
         self.auth = AuthManager(self.db)
         self.current_chat = None
         self.master_seed = None
         self.username = None
+        self.pads = {}
+        self.trash_purge = None
+        self.pointer_stats = dict.fromkeys(('checked', 'accepted', 'invalid', 'rejected_tag', 'rejected_decode'), 0)
 
     def safe_input(self, prompt):
         try:
@@ -83,11 +95,19 @@ class ChronoLibrarianCLI:
         if self.auth.verify_secret(self.username, master_seed, stored_public_key):
             self.master_seed = master_seed
             print("✅ Successful login!")
+            self.start_trash_purge()
             return True
         else:
             print("❌ Invalid secret phrase")
             return False
 
+    def start_trash_purge(self):
+        if self.db.get_trash_retention_days() is None:
+            return None
+        self.trash_purge = BackgroundDeleter(self.db.purge_expired_trash, release=self.db.release_connection)
+        self.trash_purge.start()
+        return self.trash_purge
+
     def show_main_menu(self):
         while True:
             print("\n" + "=" * 50)
@@ -98,11 +118,12 @@ class ChronoLibrarianCLI:
             print("2. ➕ Create a new chat")
             print("3. 📨 Send message")
             print("4. 📩 Receive a message")
-            print("5. 📜 Message history")
-            print("6. ⚙️ Profile settings")
-            print("7. 🚪 Exit")
+            print("5. 📎 Receive a file")
+            print("6. 📜 Message history")
+            print("7. ⚙️ Profile settings")
+            print("8. 🚪 Exit")
 
-            choice = self.safe_input("\nSelect an action (1-7): ")
+            choice = self.safe_input("\nSelect an action (1-8): ")
 
             if choice == '1':
                 self.show_chats_menu()
@@ -113,10 +134,12 @@ class ChronoLibrarianCLI:
             elif choice == '4':
                 self.receive_message_menu()
             elif choice == '5':
-                self.show_history_menu()
+                self.receive_file_menu()
             elif choice == '6':
-                self.settings_menu()
+                self.show_history_menu()
             elif choice == '7':
+                self.settings_menu()
+            elif choice == '8':
                 print("👋 Goodbye!")
                 break
             else:
@@ -192,23 +215,29 @@ class ChronoLibrarianCLI:
         while True:
             print(f"\n💬 CHAT: {chat_name}")
             print("1. 📨 Send message")
-            print("2. 📜 View history")
-            print("3. 🗑️ Clear history")
-            print("4. ❌ Delete chat")
-            print("5. ↩️ Back")
+            print("2. 📎 Send file")
+            print("3. 📜 View history")
+            print("4. ⚡ Precompute keystream pads")
+            print("5. 🗑️ Clear history")
+            print("6. ❌ Delete chat")
+            print("7. ↩️ Back")
 
-            choice = self.safe_input("\nSelect an action (1-5): ")
+            choice = self.safe_input("\nSelect an action (1-7): ")
 
             if choice == '1':
                 self.send_message_to_chat(chat_id)
             elif choice == '2':
-                self.show_chat_history(chat_id)
+                self.send_file_menu(chat_id)
             elif choice == '3':
-                self.clear_chat_history(chat_id)
+                self.show_chat_history(chat_id)
             elif choice == '4':
+                self.precompute_pads(chat_id)
+            elif choice == '5':
+                self.clear_chat_history(chat_id)
+            elif choice == '6':
                 self.delete_chat(chat_id)
                 break
-            elif choice == '5':
+            elif choice == '7':
                 break
             else:
                 print("❌ Wrong choice")
@@ -230,11 +259,26 @@ class ChronoLibrarianCLI:
 
         confirm = self.safe_input("❌ DELETE ALL messages in this chat? (y/N): ").lower()
         if confirm == 'y':
-            self.db.clear_chat_history(chat_id)
+            self.run_deleter(self.db.clear_chat_history, chat_id, total=message_count)
             print(f"✅ All messages in the chat {chat_id} removed")
         else:
             print("❌ Deletion cancelled")
 
+    def run_deleter(self, delete, *args, total=None):
+        deleter = BackgroundDeleter(
+            delete, *args, release=self.db.release_connection,
+            progress=lambda done: print(f"\r🗑️ Deleted: {done}" + (f"/{total}" if total else ""), end="", flush=True))
+        deleter.start()
+        try:
+            deleted = deleter.wait()
+        except KeyboardInterrupt:
+            deleter.cancel()
+            deleted = deleter.wait()
+            print(f"\n⚠️ Deletion interrupted after {deleted} messages")
+            raise
+        print()
+        return deleted
+
     def delete_chat(self, chat_id):
         chat_name = self.get_chat_name(chat_id)
         message_count = self.db.get_message_count(chat_id, True)
@@ -244,11 +288,39 @@ class ChronoLibrarianCLI:
 
         confirm = self.safe_input("❌ Delete this chat and ALL its messages? (y/N): ").lower()
         if confirm == 'y':
-            self.db.delete_chat(chat_id)
+            self.run_deleter(self.db.delete_chat, chat_id, total=message_count)
+            self.close_pads(chat_id)
+            self.get_pad_path(chat_id).unlink(missing_ok=True)
             print(f"✅ Chat {chat_id} has been deleted")
         else:
             print("❌ Deletion cancelled")
 
+    def precompute_pads(self, chat_id):
+        chat_name = self.get_chat_name(chat_id)
+        print(f"\n⚡ Keystream pads for: {chat_name}")
+
+        try:
+            start_epoch = int(self.safe_input(f"Start epoch [{int(time.time())}]: ") or int(time.time()))
+            hours = int(self.safe_input("Range in hours [24]: ") or 24)
+            pad_length = int(self.safe_input(f"Pad length in bytes [{DEFAULT_PAD_LENGTH}]: ") or DEFAULT_PAD_LENGTH)
+        except ValueError:
+            print("❌ Enter the number")
+            return
+
+        if hours <= 0 or pad_length <= 0:
+            print("❌ Range and pad length must be positive")
+            return
+
+        end_epoch = start_epoch + hours * 3600 - 1
+        self.close_pads(chat_id)
+        try:
+            KeystreamPads.build(self.get_pad_path(chat_id), self.master_seed, self.get_chat_seed_suffix(chat_id),
+                                start_epoch, end_epoch, pad_length,
+                                progress=lambda done, total: print(f"\r⚡ {done}/{total}", end="", flush=True))
+            print(f"\n✅ Pads saved: {self.get_pad_path(chat_id)}")
+        except Exception as e:
+            print(f"\n❌ Precompute error: {e}")
+
     def send_message_menu(self):
         chats = self.db.get_chats()
         if not chats:
@@ -295,16 +367,22 @@ class ChronoLibrarianCLI:
         print("\n📩 RECEIVING A MESSAGE")
         print("=" * 50)
         print("Enter the message index (JSON):")
-        print("Or enter 'back' to return")
+        print("Or enter 'file' to receive pointers from a file, 'back' to return")
 
         payload_str = self.safe_input("")
         if payload_str.lower() == 'back':
             return
+        if payload_str.lower() == 'file':
+            self.receive_messages_menu()
+            return
 
         try:
             message, error = self.receive_message(payload_str)
             if error:
                 print(f"❌ {error}")
+                confirm = self.safe_input("🔍 Search all chats around the epoch? (y/N): ").lower()
+                if confirm == 'y':
+                    self.discover_message_menu(payload_str)
             else:
                 print(f"\n✅ Message received:")
                 print(message)
@@ -312,6 +390,79 @@ class ChronoLibrarianCLI:
         except Exception as e:
             print(f"❌ Error: {e}")
 
+    def receive_messages_menu(self):
+        path = Path(self.safe_input("File with one pointer per line: "))
+        if not path.is_file():
+            print("❌ File not found")
+            return
+
+        try:
+            with open(path, encoding='utf-8') as f:
+                results = self.receive_messages(f)
+            print(f"✅ Received {results['accepted']} messages, rejected {results['rejected']}")
+            input("\nPress Enter to continue...")
+        except Exception as e:
+            print(f"❌ Error: {e}")
+
+    def discover_message_menu(self, payload_str):
+        try:
+            window = int(self.safe_input("Epoch window, ± seconds [300]: ") or 300)
+        except ValueError:
+            print("❌ Enter the number")
+            return
+
+        print("🔍 Searching...")
+        message, error, stats = self.discover_message(payload_str, window)
+        print(f"📊 Tried {stats.get('tried', 0)} candidates "
+              f"({stats.get('rate', 0):.0f}/s on {stats.get('workers', 1)} workers)")
+        if error:
+            print(f"❌ {error}")
+        else:
+            print(f"\n✅ Message discovered:")
+            print(message)
+            input("\nPress Enter to continue...")
+
+    def send_file_menu(self, chat_id):
+        chat_name = self.get_chat_name(chat_id)
+        print(f"\n📎 Sending a file to: {chat_name}")
+
+        src_path = Path(self.safe_input("File to encrypt: "))
+        if not src_path.is_file():
+            print("❌ File not found")
+            return
+
+        default_path = src_path.with_name(src_path.name + ".clms")
+        dst_path = Path(self.safe_input(f"Container file [{default_path}]: ") or default_path)
+
+        try:
+            header = self.send_file(src_path, dst_path, chat_id)
+            print(f"\n✅ File encrypted: {dst_path}")
+            print("\n📋 Pointer for:")
+            print(json.dumps(header, ensure_ascii=False))
+            input("\nPress Enter to continue...")
+        except Exception as e:
+            print(f"\n❌ Sending error: {e}")
+
+    def receive_file_menu(self):
+        print("\n📎 RECEIVING A FILE")
+        print("=" * 50)
+
+        src_path = Path(self.safe_input("Container file: "))
+        if not src_path.is_file():
+            print("❌ File not found")
+            return
+
+        default_path = src_path.with_suffix('') if src_path.suffix == '.clms' else src_path.with_name(
+            src_path.name + ".out")
+        dst_path = Path(self.safe_input(f"Save decrypted file as [{default_path}]: ") or default_path)
+
+        try:
+            size = self.receive_file(src_path, dst_path)
+            print(f"\n✅ File received: {dst_path} ({size} bytes)")
+            input("\nPress Enter to continue...")
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
+
     def show_history_menu(self):
         while True:
             print("\n📜 MESSAGE HISTORY")
@@ -321,9 +472,10 @@ class ChronoLibrarianCLI:
             print("3. 🔍 Search by ID")
             print("4. 🗑️ Basket")
             print("5. ❌ Delete message")
-            print("6. ↩️ Back")
+            print("6. 📊 Statistics")
+            print("7. ↩️ Back")
 
-            choice = self.safe_input("\nSelect an action (1-6): ")
+            choice = self.safe_input("\nSelect an action (1-7): ")
 
             if choice == '1':
                 self.show_all_history()
@@ -336,10 +488,31 @@ class ChronoLibrarianCLI:
             elif choice == '5':
                 self.delete_message_menu()
             elif choice == '6':
+                self.show_statistics()
+            elif choice == '7':
                 break
             else:
                 print("❌ Wrong choice")
 
+    def show_statistics(self):
+        total = self.db.get_message_count(None, True)
+        active = self.db.get_message_count(None, False)
+        stats = self.pointer_stats
+        rejected = stats['invalid'] + stats['rejected_tag'] + stats['rejected_decode']
+
+        print("\n📊 STATISTICS")
+        print("=" * 50)
+        print(f"💬 Chats: {len(self.db.get_chats())}")
+        print(f"📨 Messages: {active} (🗑️ {total - active} in basket)")
+        print(f"📩 Pointers checked this session: {stats['checked']}")
+        print(f"   ✅ Accepted: {stats['accepted']}")
+        print(f"   🔐 Rejected by tag: {stats['rejected_tag']}")
+        print(f"   ❌ Rejected after decryption: {stats['rejected_decode']}")
+        print(f"   ⚠️ Invalid format: {stats['invalid']}")
+        if stats['checked']:
+            print(f"   📉 Rejection rate: {100 * rejected / stats['checked']:.1f}%")
+        input("\nPress Enter to continue...")
+
     def show_all_history(self):
         messages = self.db.get_messages(None, 0, False)
         if not messages:
@@ -459,23 +632,86 @@ class ChronoLibrarianCLI:
             print(f"👤 Имя: {self.username}")
             print("1. 🔑 Show public key")
             print("2. 🔄 Change secret phrase")
-            print("3. 🗑️ Delete profile")
-            print("4. ↩️ Back")
-
-            choice = self.safe_input("\nSelect an action (1-4): ")
+            print(f"3. 🗜️ Compress messages: {'on' if self.compression_enabled() else 'off'}")
+            print("4. 💾 Export history")
+            print("5. 📥 Import history")
+            retention = self.db.get_trash_retention_days()
+            print(f"6. 🧹 Basket retention: {f'{retention} days' if retention else 'forever'}")
+            print("7. 💽 Reclaim disk space")
+            print("8. 🔄 Merge with another database")
+            print("9. 🗑️ Delete profile")
+            print("10. ↩️ Back")
+
+            choice = self.safe_input("\nSelect an action (1-10): ")
 
             if choice == '1':
                 self.show_public_key()
             elif choice == '2':
                 self.change_secret()
             elif choice == '3':
+                self.toggle_compression()
+            elif choice == '4':
+                self.export_history()
+            elif choice == '5':
+                self.import_history()
+            elif choice == '6':
+                self.trash_retention_menu()
+            elif choice == '7':
+                self.reclaim_space()
+            elif choice == '8':
+                self.merge_database()
+            elif choice == '9':
                 self.delete_profile()
                 break
-            elif choice == '4':
+            elif choice == '10':
                 break
             else:
                 print("❌ Wrong choice")
 
+    def trash_retention_menu(self):
+        print("\n🧹 BASKET RETENTION")
+        print("=" * 50)
+        print("Messages in the basket older than this are purged automatically at login.")
+
+        try:
+            days = int(self.safe_input("Keep deleted messages for N days (0 = forever): ") or 0)
+        except ValueError:
+            print("❌ Enter the number")
+            return
+        if days < 0:
+            print("❌ Enter a positive number")
+            return
+
+        self.db.set_trash_retention_days(days or None)
+        if not days:
+            print("✅ Deleted messages are kept until removed manually")
+            return
+
+        purged = self.run_deleter(self.db.purge_expired_trash)
+        print(f"✅ Retention set to {days} days, {purged} expired messages purged")
+
+    def reclaim_space(self):
+        print("\n💽 RECLAIM DISK SPACE")
+        print("=" * 50)
+
+        if not self.db.is_incremental_vacuum_enabled():
+            print("⚠️  This database was created without incremental vacuum support.")
+            confirm = self.safe_input("Convert it now? This rewrites the whole file once. (y/N): ").lower()
+            if confirm != 'y':
+                print("❌ Cancelled")
+                return
+            self.db.enable_incremental_vacuum()
+            print("✅ Incremental vacuum enabled")
+            return
+
+        free_pages = self.db.get_free_pages()
+        if not free_pages:
+            print("✅ Nothing to reclaim")
+            return
+
+        freed = self.db.incremental_vacuum()
+        print(f"✅ Released {freed} free pages")
+
     def show_public_key(self):
         config = self.db.get_config()
         public_key = config.get('public_key', '')
@@ -506,9 +742,91 @@ class ChronoLibrarianCLI:
         new_public_key = self.auth.generate_public_key(self.username, new_secret)
         self.db.set_config('public_key', new_public_key)
         self.master_seed = new_secret
+        self.close_pads()
 
         print("✅ Secret phrase changed!")
 
+    def toggle_compression(self):
+        enabled = not self.compression_enabled()
+        self.db.set_config('compression', '1' if enabled else '0')
+        if enabled:
+            print("✅ Compression enabled. Recipients need CLM with compressed pointer support.")
+        else:
+            print("✅ Compression disabled")
+
+    def export_history(self):
+        print("\n💾 EXPORT HISTORY")
+        print("=" * 50)
+
+        default_path = Path.cwd() / f"clm-history-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+        path = self.safe_input(f"Export file (.jsonl, .gz, .xz, .bz2) [{default_path}]: ") or str(default_path)
+
+        try:
+            total = self.db.export_history(
+                path, progress=lambda count: print(f"\r📦 Exported: {count}", end="", flush=True))
+            print(f"\n✅ Exported {total} messages to {path}")
+        except Exception as e:
+            print(f"\n❌ Export error: {e}")
+
+    def import_history(self):
+        print("\n📥 IMPORT HISTORY")
+        print("=" * 50)
+
+        path = self.safe_input("Import file: ")
+        if not path:
+            print("❌ File is required")
+            return
+        if not Path(path).exists():
+            print("❌ File not found")
+            return
+
+        try:
+            stats = self.db.import_history(
+                path, progress=lambda read, imported: print(
+                    f"\r📦 Read: {read}, imported: {imported}", end="", flush=True))
+            print(f"\n✅ Imported {stats['imported']} messages "
+                  f"({stats['skipped']} duplicates skipped, {stats['chats']} new chats)")
+            if stats['remapped']:
+                print(f"ℹ️ {stats['remapped']} chats were matched by seed suffix and imported under different ids")
+        except Exception as e:
+            print(f"\n❌ Import error: {e}")
+
+    def merge_database(self):
+        print("\n🔄 MERGE WITH ANOTHER DATABASE")
+        print("=" * 50)
+
+        path = self.safe_input("Other clm.db file: ")
+        if not path:
+            print("❌ File is required")
+            return
+        if not Path(path).is_file():
+            print("❌ File not found")
+            return
+        if Path(path).resolve() == Path(self.db.db_path).resolve():
+            print("❌ This is the current database")
+            return
+
+        both = self.safe_input("Also copy local messages into the other database? (y/N): ").lower() == 'y'
+        progress = lambda transferred, imported: print(
+            f"\r📦 Transferred: {transferred}, imported: {imported}", end="", flush=True)
+
+        other = None
+        try:
+            other = CLMDatabase(path, mode='rw' if both else 'ro')
+            stats = merge_databases(self.db, other, progress=progress)
+            print(f"\n✅ Pulled {stats['imported']} messages from {stats['buckets']} changed buckets "
+                  f"({stats['skipped']} duplicates skipped, {stats['chats']} new chats) in {stats['elapsed']:.2f}s")
+            if stats['remapped']:
+                print(f"ℹ️ {stats['remapped']} chats were matched by seed suffix and merged under different ids")
+            if both:
+                stats = merge_databases(other, self.db, progress=progress)
+                print(f"\n✅ Pushed {stats['imported']} messages to {path} in {stats['elapsed']:.2f}s")
+        except Exception as e:
+            print(f"\n❌ Merge error: {e}")
+        finally:
+            if other is not None:
+                other.close()
+
     def delete_profile(self):
         print("\n❌ DELETE PROFILE")
         print("=" * 50)
@@ -523,9 +841,13 @@ class ChronoLibrarianCLI:
             print("❌ Deletion cancelled")
             return
 
+        self.close()
         db_path = self.config_dir / "clm.db"
-        if db_path.exists():
-            db_path.unlink()
+        for path in (db_path, db_path.with_name("clm.db-wal"), db_path.with_name("clm.db-shm")):
+            if path.exists():
+                path.unlink()
+
+        shutil.rmtree(self.config_dir / "pads", ignore_errors=True)
 
         print("✅ The profile has been deleted. To use it, please launch the program again..")
         sys.exit(0)
@@ -541,9 +863,7 @@ class ChronoLibrarianCLI:
 
         seed_suffix = self.safe_input("Enter the seed suffix (or Enter for automatic): ")
 
-        chats = self.db.get_chats()
-        numeric_ids = [int(k) for k in chats.keys() if k.isdigit()]
-        new_id = str(max(numeric_ids) + 1) if numeric_ids else '0'
+        new_id = self.db.next_chat_id()
 
         if not seed_suffix:
             seed_suffix = f"chat_{new_id}"
@@ -589,10 +909,58 @@ class ChronoLibrarianCLI:
         chats = self.db.get_chats()
         return chats.get(chat_id, {}).get("name", f"Chat {chat_id}")
 
+    def close(self):
+        if self.trash_purge is not None:
+            self.trash_purge.cancel()
+            self.trash_purge.join()
+            self.trash_purge = None
+        self.close_pads()
+        try:
+            self.db.flush()
+        except MessageWriteError as e:
+            print(f"❌ {e}")
+            for row, error in e.failed:
+                print(f"   {row[0]} message in chat {row[1]} at epoch {row[2]}: {error}")
+        self.db.close()
+        self.master_seed = None
+
+    def get_pad_path(self, chat_id: str) -> Path:
+        return self.config_dir / "pads" / f"{chat_id}.pad"
+
+    def get_pads(self, chat_id: str) -> Optional[KeystreamPads]:
+        if chat_id not in self.pads:
+            pads = None
+            path = self.get_pad_path(chat_id)
+            if path.exists():
+                try:
+                    pads = KeystreamPads(path, self.master_seed, self.get_chat_seed_suffix(chat_id))
+                except (OSError, ValueError):
+                    pads = None
+            self.pads[chat_id] = pads
+        return self.pads[chat_id]
+
+    def close_pads(self, chat_id: Optional[str] = None):
+        for cid in ([chat_id] if chat_id is not None else list(self.pads)):
+            pads = self.pads.pop(cid, None)
+            if pads:
+                pads.close()
+
     def get_chat_seed_suffix(self, chat_id: str) -> str:
         chats = self.db.get_chats()
         return chats.get(chat_id, {}).get("seed_suffix", f"chat_{chat_id}")
 
+    def compression_enabled(self) -> bool:
+        return self.db.get_config().get('compression', '0') == '1'
+
+    def make_pointer(self, chat_id: str, epoch_index: int, ciphertext: bytes, codec: int = CODEC_NONE) -> str:
+        tag = pointer_tag(self.master_seed, self.get_chat_seed_suffix(chat_id), epoch_index, codec, ciphertext)
+        payload = {'v': POINTER_VERSION_TAGGED, 'c': chat_id, 'e': epoch_index}
+        if codec != CODEC_NONE:
+            payload['z'] = codec
+        payload['m'] = tag.hex()
+        payload['d'] = ciphertext.hex()
+        return json.dumps(payload, ensure_ascii=False)
+
     def send_message(self, message: str, chat_id: str) -> str:
         if not self.master_seed or not self.username:
             raise ValueError("❌ Authentication required")
@@ -600,66 +968,192 @@ class ChronoLibrarianCLI:
         epoch_index = int(time.time())
         signed_message = f"{self.username}: {message}"
 
-        chat_seed_suffix = self.get_chat_seed_suffix(chat_id)
-        seed_material = f"{self.master_seed}_{chat_seed_suffix}_{epoch_index}".encode()
-        drbg = HMAC_DRBG(seed_material)
+        drbg = chat_keystream(self.master_seed, self.get_chat_seed_suffix(chat_id), epoch_index)
 
         message_bytes = signed_message.encode('utf-8')
+        if self.compression_enabled():
+            codec, message_bytes = compress_message(message_bytes)
+        else:
+            codec = CODEC_NONE
         key_bytes = drbg.generate(len(message_bytes))
         ciphertext = encrypt_decrypt(message_bytes, key_bytes)
 
-        payload = {'c': chat_id, 'e': epoch_index, 'd': ciphertext.hex()}
-        payload_str = json.dumps(payload, ensure_ascii=False)
+        payload_str = self.make_pointer(chat_id, epoch_index, ciphertext, codec)
 
         self.db.save_message('sent', chat_id, epoch_index, signed_message, payload_str)
         return payload_str
 
+    def send_file(self, src_path: Path, dst_path: Path, chat_id: str) -> Dict:
+        if not self.master_seed or not self.username:
+            raise ValueError("❌ Authentication required")
+
+        header = new_header(chat_id, int(time.time()))
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            size = encrypt_file(src, dst, self.master_seed, self.get_chat_seed_suffix(chat_id), header,
+                                progress=lambda done: print(f"\r🔒 {done} bytes", end="", flush=True))
+
+        signed_message = f"{self.username}: 📎 {src_path.name} ({size} bytes)"
+        self.db.save_message('sent', chat_id, header['e'], signed_message, json.dumps(header, ensure_ascii=False))
+        return header
+
+    def receive_file(self, src_path: Path, dst_path: Path) -> int:
+        if not self.master_seed:
+            raise ValueError("❌ Authentication required")
+
+        tmp_path = dst_path.with_name(dst_path.name + ".part")
+        try:
+            with open(src_path, 'rb') as src:
+                header = read_header(src)
+                chat_id = str(header['c'])
+                with open(tmp_path, 'wb') as dst:
+                    size = decrypt_file(src, dst, self.master_seed, self.get_chat_seed_suffix(chat_id), header,
+                                        progress=lambda done: print(f"\r🔓 {done} bytes", end="", flush=True))
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        tmp_path.replace(dst_path)
+
+        signed_message = f"📎 {dst_path.name} ({size} bytes)"
+        self.db.save_message('received', chat_id, int(header['e']), signed_message,
+                             json.dumps(header, ensure_ascii=False))
+        return size
+
     def receive_message(self, payload_str: str) -> Tuple[Optional[str], Optional[str]]:
+        self.pointer_stats['checked'] += 1
         try:
             payload = json.loads(payload_str)
             chat_id = str(payload['c'])
             epoch_index = int(payload['e'])
-            ciphertext_hex = payload['d']
+            ciphertext = bytes.fromhex(payload['d'])
+            codec, tag = pointer_codec_and_tag(payload)
         except:
+            self.pointer_stats['invalid'] += 1
             return None, "❌ Invalid pointer format"
 
         if not self.master_seed:
             return None, "❌ Authentication required"
 
         chat_seed_suffix = self.get_chat_seed_suffix(chat_id)
-        seed_material = f"{self.master_seed}_{chat_seed_suffix}_{epoch_index}".encode()
-        drbg = HMAC_DRBG(seed_material)
+        if tag is not None and not verify_pointer_tag(tag, self.master_seed, chat_seed_suffix,
+                                                      epoch_index, codec, ciphertext):
+            self.pointer_stats['rejected_tag'] += 1
+            return None, "❌ Pointer authentication failed"
 
-        ciphertext = bytes.fromhex(ciphertext_hex)
-        key_bytes = drbg.generate(len(ciphertext))
+        pads = self.get_pads(chat_id)
+        key_bytes = pads.keystream(epoch_index, len(ciphertext)) if pads else None
+        if key_bytes is None:
+            drbg = chat_keystream(self.master_seed, chat_seed_suffix, epoch_index)
+            key_bytes = drbg.generate(len(ciphertext))
 
         try:
-            message_bytes = encrypt_decrypt(ciphertext, key_bytes)
+            message_bytes = decompress_message(codec, encrypt_decrypt(ciphertext, key_bytes))
             signed_message = message_bytes.decode('utf-8')
 
             if ": " not in signed_message:
+                    self.pointer_stats['rejected_decode'] += 1
                     return None, "❌ Invalid message format"
 
             self.db.save_message('received', chat_id, epoch_index, signed_message, payload_str)
+            self.pointer_stats['accepted'] += 1
             return signed_message, None
 
-        except UnicodeDecodeError:
+        except (UnicodeDecodeError, ValueError, zlib.error):
+            self.pointer_stats['rejected_decode'] += 1
             return None, "❌ Decryption error"
 
+    def receive_messages(self, payload_strs) -> Dict[str, int]:
+        results = {'accepted': 0, 'rejected': 0}
+        for payload_str in payload_strs:
+            payload_str = payload_str.strip()
+            if not payload_str:
+                continue
+            _, error = self.receive_message(payload_str)
+            results['rejected' if error else 'accepted'] += 1
+        return results
+
+    def discover_message(self, payload_str: str, window: int = 300) -> Tuple[Optional[str], Optional[str], Dict]:
+        try:
+            payload = json.loads(payload_str)
+            if not isinstance(payload, dict):
+                payload = {'d': payload}
+            ciphertext = bytes.fromhex(payload['d'])
+        except:
+            try:
+                payload = {}
+                ciphertext = bytes.fromhex(payload_str)
+            except ValueError:
+                return None, "❌ Invalid pointer format", {}
 
-def main():
-    cli = ChronoLibrarianCLI()
+        if not self.master_seed:
+            return None, "❌ Authentication required", {}
 
-    config = cli.db.get_config()
-    if 'public_key' not in config:
-        print("🌌 Welcome to Chrono-Library Messenger!")
-        print("=" * 50)
-        if cli.setup():
+        chats = {cid: chat_info['seed_suffix'] for cid, chat_info in self.db.get_chats().items()}
+        if payload.get('c') is not None and str(payload['c']) in chats:
+            chats = {str(payload['c']): chats[str(payload['c'])]}
+
+        try:
+            center = int(payload['e'])
+        except (KeyError, TypeError, ValueError):
+            center = int(time.time())
+
+        try:
+            codec, tag = pointer_codec_and_tag(payload)
+        except (TypeError, ValueError):
+            return None, "❌ Invalid pointer format", {}
+
+        found, stats = discover(self.master_seed, ciphertext, chats, center, window, codec=codec, tag=tag)
+        if found is None:
+            return None, "❌ No matching chat and epoch found", stats
+
+        chat_id, epoch_index, signed_message = found
+        pointer = self.make_pointer(chat_id, epoch_index, ciphertext, codec)
+        self.db.save_message('received', chat_id, epoch_index, signed_message, pointer)
+        return signed_message, None, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="clm", description="Chrono-Library Messenger")
+    parser.add_argument("-p", "--profile", default=DEFAULT_PROFILE,
+                        help="identity profile to use (default: %(default)s)")
+    parser.add_argument("--list-profiles", action="store_true", help="list existing profiles and exit")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="persist messages from a background writer in group commits")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="messages per group commit (default: %(default)s)")
+    parser.add_argument("--flush-interval", type=float, default=0.05,
+                        help="seconds to wait before committing a partial group (default: %(default)s)")
+    parser.add_argument("--synchronous", choices=SYNCHRONOUS_LEVELS, default='NORMAL', type=str.upper,
+                        help="SQLite durability level for group commits (default: %(default)s)")
+    args = parser.parse_args()
+
+    router = ProfileRouter(ChronoLibrarianCLI)
+    if args.list_profiles:
+        for name in router.profiles():
+            print(name)
+        return
+
+    try:
+        cli = router.session(args.profile)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    if args.write_behind:
+        cli.db.enable_write_behind(args.batch_size, args.flush_interval, args.synchronous)
+
+    try:
+        config = cli.db.get_config()
+        if 'public_key' not in config:
+            print("🌌 Welcome to Chrono-Library Messenger!")
+            print("=" * 50)
+            if cli.setup():
+                if cli.login():
+                    cli.show_main_menu()
+        else:
             if cli.login():
                 cli.show_main_menu()
-    else:
-        if cli.login():
-            cli.show_main_menu()
+    finally:
+        router.close()
 
 
 if __name__ == "__main__":
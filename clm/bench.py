@@ -0,0 +1,149 @@
+# Copyright © 2025, Alexander Suvorov
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from .core import CODEC_NONE, chat_keystream, encrypt_decrypt, verify_pointer_tag
+from .stream import DEFAULT_CHUNK_SIZE, decrypt_file, encrypt_file, new_header, read_header
+
+MB = 1024 * 1024
+
+MESSAGE_CORPUS = [
+    "yo",
+    "k",
+    "Landed. Taxi queue is huge, grabbing a bus instead.",
+    "Can someone water the plants while I'm away? Key is under the blue pot.",
+    "Pushed the hotfix, CI should pick it up shortly",
+    "Dinner: pasta or curry? Vote before six",
+    "Lost my charger again... borrowing yours",
+    "The invoice number is INV-20931, amount due 1,240.00 EUR, payable within thirty days.",
+    "Traffic jam on the ring road, running twenty minutes late",
+    "Photos from the hike: https://photos.example.net/album/7f3c91",
+    "Congrats on the new job!! 🥳",
+    "Postpone the dentist appointment, it clashes with the school play.",
+    "Which version of the library are we pinning? The changelog mentions a breaking change in the parser, "
+    "and our importer relies on the old behaviour for empty fields.",
+    "Купи молоко и хлеб по дороге домой",
+    "haha true",
+    "Server disk at 91%, rotating the logs now and adding an alert for next time.",
+    "Parking permit expires by the end of the month, renewal form is on the fridge.",
+    "Sleep well",
+    "Maybe, depends on the weather. If it rains we stay in and play board games.",
+    "Battery almost dead, will text when I'm back online",
+]
+
+
+class _RepeatingReader:
+    def __init__(self, size: int):
+        self.remaining = size
+        self.block = os.urandom(DEFAULT_CHUNK_SIZE)
+
+    def read(self, n: int) -> bytes:
+        n = min(n, self.remaining, len(self.block))
+        self.remaining -= n
+        return self.block[:n]
+
+
+def bench_stream(size_mb: int = 32, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    size = size_mb * MB
+    master_seed, seed_suffix = "benchmark-secret", "benchmark"
+
+    with tempfile.TemporaryFile() as container, open(os.devnull, 'wb') as sink:
+        header = new_header('0', int(time.time()), chunk_size)
+        started = time.perf_counter()
+        encrypt_file(_RepeatingReader(size), container, master_seed, seed_suffix, header)
+        encrypt_elapsed = time.perf_counter() - started
+
+        container.seek(0)
+        started = time.perf_counter()
+        header = read_header(container)
+        decrypt_file(container, sink, master_seed, seed_suffix, header)
+        decrypt_elapsed = time.perf_counter() - started
+
+    print(f"📦 Stream: {size_mb} MB in {chunk_size // 1024} KB chunks")
+    print(f"🔒 Encrypt: {size / MB / encrypt_elapsed:.2f} MB/s")
+    print(f"🔓 Decrypt: {size / MB / decrypt_elapsed:.2f} MB/s")
+
+
+def bench_compress(rounds: int = 50):
+    from .__main__ import ChronoLibrarianCLI
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        cli = ChronoLibrarianCLI(config_dir)
+        cli.username, cli.master_seed = "alice", "benchmark-secret"
+
+        results = {}
+        for enabled in (False, True):
+            cli.db.set_config('compression', '1' if enabled else '0')
+            sizes, latencies = [], []
+            for _ in range(rounds):
+                for message in MESSAGE_CORPUS:
+                    started = time.perf_counter()
+                    pointer = cli.send_message(message, '1')
+                    _, error = cli.receive_message(pointer)
+                    latencies.append(time.perf_counter() - started)
+                    if error:
+                        raise RuntimeError(error)
+                    sizes.append(len(pointer.encode('utf-8')))
+            results[enabled] = (statistics.mean(sizes), statistics.median(latencies))
+        cli.close()
+
+    print(f"💬 Corpus: {len(MESSAGE_CORPUS)} messages x {rounds} rounds (send + receive)")
+    for enabled, label in ((False, "plain"), (True, "compressed")):
+        size, latency = results[enabled]
+        print(f"   {label:>10}: {size:.1f} bytes/pointer, {latency * 1000:.3f} ms median")
+    print(f"📉 Pointer size: {100 * (1 - results[True][0] / results[False][0]):.1f}% smaller")
+
+
+def bench_reject(count: int = 20000, size: int = 256):
+    master_seed, seed_suffix = "benchmark-secret", "benchmark"
+    garbage = [os.urandom(size) for _ in range(count)]
+    tag = os.urandom(8)
+
+    started = time.perf_counter()
+    for epoch_index, ciphertext in enumerate(garbage):
+        key_bytes = chat_keystream(master_seed, seed_suffix, epoch_index).generate(len(ciphertext))
+        try:
+            encrypt_decrypt(ciphertext, key_bytes).decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    untagged = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for epoch_index, ciphertext in enumerate(garbage):
+        verify_pointer_tag(tag, master_seed, seed_suffix, epoch_index, CODEC_NONE, ciphertext)
+    tagged = time.perf_counter() - started
+
+    print(f"🗑️ Rejecting {count} foreign {size}-byte pointers")
+    print(f"   untagged (keystream + decode): {count / untagged:,.0f}/s")
+    print(f"   tagged (one HMAC): {count / tagged:,.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m clm.bench", description="Chrono-Library Messenger benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    stream_parser = subparsers.add_parser("stream", help="chunked file encryption throughput")
+    stream_parser.add_argument("--size-mb", type=int, default=32)
+    stream_parser.add_argument("--chunk-kb", type=int, default=DEFAULT_CHUNK_SIZE // 1024)
+
+    compress_parser = subparsers.add_parser("compress", help="pointer size and latency with compression")
+    compress_parser.add_argument("--rounds", type=int, default=50)
+
+    reject_parser = subparsers.add_parser("reject", help="rejection rate for foreign or corrupted pointers")
+    reject_parser.add_argument("--count", type=int, default=20000)
+    reject_parser.add_argument("--size", type=int, default=256)
+
+    args = parser.parse_args()
+    if args.benchmark == "stream":
+        bench_stream(args.size_mb, args.chunk_kb * 1024)
+    elif args.benchmark == "compress":
+        bench_compress(args.rounds)
+    elif args.benchmark == "reject":
+        bench_reject(args.count, args.size)
+
+
+if __name__ == "__main__":
+    main()
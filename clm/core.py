@@ -1,6 +1,7 @@
 # Copyright © 2025, Alexander Suvorov
 import hmac
 import hashlib
+import zlib
 
 
 class HMAC_DRBG:
@@ -18,12 +19,105 @@ class HMAC_DRBG:
             self.V = hmac.new(self.K, self.V, hashlib.sha256).digest()
 
     def generate(self, num_bytes):
-        temp = b''
-        while len(temp) < num_bytes:
-            self.V = hmac.new(self.K, self.V, hashlib.sha256).digest()
-            temp += self.V
-        return temp[:num_bytes]
+        keyed = hmac.new(self.K, digestmod=hashlib.sha256)
+        blocks = []
+        for _ in range(-(-num_bytes // 32)):
+            mac = keyed.copy()
+            mac.update(self.V)
+            self.V = mac.digest()
+            blocks.append(self.V)
+        return b''.join(blocks)[:num_bytes]
 
 
 def encrypt_decrypt(data, key):
-    return bytes([d ^ k for d, k in zip(data, key)])
+    length = min(len(data), len(key))
+    if not length:
+        return b''
+    result = int.from_bytes(data[:length], 'big') ^ int.from_bytes(key[:length], 'big')
+    return result.to_bytes(length, 'big')
+
+
+def chat_seed_material(master_seed, seed_suffix, epoch_index):
+    return f"{master_seed}_{seed_suffix}_{epoch_index}".encode()
+
+
+def chat_keystream(master_seed, seed_suffix, epoch_index):
+    return HMAC_DRBG(chat_seed_material(master_seed, seed_suffix, epoch_index))
+
+
+CODEC_NONE = 0
+CODEC_DEFLATE = 1
+CODEC_DEFLATE_DICT = 2
+MAX_MESSAGE_SIZE = 1024 * 1024
+POINTER_TAG_SIZE = 8
+POINTER_VERSION_PLAIN = 1
+POINTER_VERSION_COMPRESSED = 2
+POINTER_VERSION_TAGGED = 3
+
+MESSAGE_DICTIONARY = (
+    b"https://www. .com .org .net @gmail.com "
+    b"Could you please send me the file? I will send it later. Let me know when you are ready. "
+    b"What do you think about this? I don't know, I think so. Are you sure? "
+    b"Did you get my message? I got your message, thank you! Can we talk tomorrow? "
+    b"I'm on my way, see you soon. I'll call you back in a minute. Where are you now? "
+    b"Good morning! Good evening! Good night! Have a nice day! Happy birthday! "
+    b"meeting at the office, at home, this week, next week, tonight, tomorrow, today, "
+    b"yesterday, right now, in an hour, o'clock, Monday Tuesday Wednesday Thursday Friday Saturday Sunday "
+    b"Yes, of course. No, thanks. Okay, sounds good. Sorry, I can't. No problem. "
+    b"Thank you very much! Thanks! Please, Hello, how are you? I'm fine, and you? "
+)
+
+
+def compress_message(data):
+    candidates = [(CODEC_NONE, data)]
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9)
+    candidates.append((CODEC_DEFLATE, compressor.compress(data) + compressor.flush()))
+
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zdict=MESSAGE_DICTIONARY)
+    candidates.append((CODEC_DEFLATE_DICT, compressor.compress(data) + compressor.flush()))
+
+    return min(candidates, key=lambda candidate: len(candidate[1]))
+
+
+def message_decompressor(codec):
+    if codec == CODEC_DEFLATE:
+        return zlib.decompressobj(-15)
+    if codec == CODEC_DEFLATE_DICT:
+        return zlib.decompressobj(-15, zdict=MESSAGE_DICTIONARY)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress_message(codec, data):
+    if codec == CODEC_NONE:
+        return data
+
+    decompressor = message_decompressor(codec)
+    message_bytes = decompressor.decompress(data, MAX_MESSAGE_SIZE)
+    if not decompressor.eof or decompressor.unused_data or decompressor.unconsumed_tail:
+        raise zlib.error("Invalid compressed message")
+    return message_bytes
+
+
+def pointer_tag(master_seed, seed_suffix, epoch_index, codec, ciphertext):
+    seed_material = chat_seed_material(master_seed, seed_suffix, epoch_index)
+    mac = hmac.new(seed_material, b'clm-pointer-tag' + bytes([codec]) + ciphertext, hashlib.sha256)
+    return mac.digest()[:POINTER_TAG_SIZE]
+
+
+def verify_pointer_tag(tag, master_seed, seed_suffix, epoch_index, codec, ciphertext):
+    return hmac.compare_digest(tag, pointer_tag(master_seed, seed_suffix, epoch_index, codec, ciphertext))
+
+
+def pointer_codec_and_tag(payload):
+    version = int(payload.get('v', POINTER_VERSION_PLAIN))
+    if version not in (POINTER_VERSION_PLAIN, POINTER_VERSION_COMPRESSED, POINTER_VERSION_TAGGED):
+        raise ValueError(f"Unsupported pointer version: {version}")
+    if 'z' in payload and version < POINTER_VERSION_COMPRESSED:
+        raise ValueError("Compressed pointers need version 2 or later")
+    if ('m' in payload) != (version == POINTER_VERSION_TAGGED):
+        raise ValueError("Version 3 pointers must carry a tag and only they may")
+
+    codec = int(payload.get('z', CODEC_NONE))
+    tag = bytes.fromhex(payload['m']) if version == POINTER_VERSION_TAGGED else None
+    return codec, tag
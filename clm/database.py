@@ -1,16 +1,291 @@
 # Copyright © 2025, Alexander Suvorov
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import atexit
+import queue
+import signal
 import sqlite3
+import sys
+import threading
+import time
+import weakref
 from datetime import datetime
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+EXPORT_FORMAT = "clm-history"
+EXPORT_VERSION = 1
+
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+DELETE_BATCH_SIZE = 1000
+
+SCHEMA_VERSION = 1
+SYNC_BUCKET_SECONDS = 86400
+
+INSERT_MESSAGE_SQL = '''
+    INSERT INTO messages (type, chat_id, epoch_index, message, payload, timestamp, datetime, row_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_active_writers = weakref.WeakSet()
+_exit_hooks_installed = False
+
+
+def message_row_hash(msg_type: str, payload: str) -> int:
+    digest = hashlib.blake2b(f"{msg_type}\x00{payload}".encode('utf-8'), digest_size=5).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _close_active_writers():
+    for writer in list(_active_writers):
+        try:
+            writer.close()
+        except MessageWriteError as e:
+            print(f"❌ {e}", file=sys.stderr)
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _install_exit_hooks():
+    global _exit_hooks_installed
+    if _exit_hooks_installed:
+        return
+    _exit_hooks_installed = True
+
+    atexit.register(_close_active_writers)
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for name in ('SIGTERM', 'SIGHUP'):
+        signum = getattr(signal, name, None)
+        if signum is not None and signal.getsignal(signum) == signal.SIG_DFL:
+            signal.signal(signum, _exit_on_signal)
+
+
+def open_history_file(path, mode: str):
+    path = str(path)
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+    if path.endswith('.xz'):
+        return lzma.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.bz2'):
+        return bz2.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class MessageWriteError(sqlite3.Error):
+    def __init__(self, failed: List[Tuple[tuple, Exception]]):
+        super().__init__(f"{len(failed)} queued messages could not be saved: {failed[-1][1]}")
+        self.failed = failed
+
+
+class MessageWriter(threading.Thread):
+    def __init__(self, db_path, batch_size: int = 500, flush_interval: float = 0.05,
+                 synchronous: str = 'NORMAL'):
+        super().__init__(name="clm-message-writer", daemon=True)
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level: {synchronous}")
+
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.failed = []
+        self._failed_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop_marker = object()
+        self._flush_marker = object()
+        self._closed = False
+
+    def put(self, row: tuple):
+        if self._closed:
+            raise RuntimeError("Message writer is closed")
+        self._queue.put(row)
+
+    def drain(self):
+        if self._queue.unfinished_tasks:
+            self._queue.put(self._flush_marker)
+        self._queue.join()
+
+    def flush(self):
+        self.drain()
+        self.raise_failures()
+
+    def raise_failures(self):
+        with self._failed_lock:
+            failed, self.failed = self.failed, []
+        if failed:
+            raise MessageWriteError(failed)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._stop_marker)
+        self.join()
+        self.raise_failures()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                batch = []
+                while True:
+                    if item is self._stop_marker:
+                        stopping = True
+                        self._queue.task_done()
+                    elif item is self._flush_marker:
+                        self._queue.task_done()
+                        break
+                    else:
+                        batch.append(item)
+                    if stopping or len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get(timeout=self.flush_interval)
+                    except queue.Empty:
+                        break
+
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(INSERT_MESSAGE_SQL, batch)
+                    except sqlite3.Error:
+                        self._write_rows(conn, batch)
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _write_rows(self, conn, rows: List[tuple]):
+        for row in rows:
+            try:
+                with conn:
+                    conn.execute(INSERT_MESSAGE_SQL, row)
+            except sqlite3.Error as e:
+                with self._failed_lock:
+                    self.failed.append((row, e))
+
+
+class BackgroundDeleter(threading.Thread):
+    def __init__(self, delete: Callable[..., int], *args, progress: Optional[Callable[[int], None]] = None,
+                 on_done: Optional[Callable[[int], None]] = None, release: Optional[Callable[[], None]] = None,
+                 **kwargs):
+        super().__init__(name="clm-background-deleter", daemon=True)
+        self.delete = delete
+        self.delete_args = args
+        self.delete_kwargs = kwargs
+        self._progress = progress
+        self._on_done = on_done
+        self._release = release
+        self._stop_event = threading.Event()
+        self.deleted = 0
+        self.error = None
+
+    def run(self):
+        try:
+            self.deleted = self.delete(*self.delete_args, progress=self._report, stop_event=self._stop_event,
+                                       **self.delete_kwargs)
+        except sqlite3.Error as e:
+            self.error = e
+        finally:
+            if self._release:
+                self._release()
+        if self._on_done:
+            self._on_done(self.deleted)
+
+    def _report(self, deleted: int):
+        self.deleted = deleted
+        if self._progress:
+            self._progress(deleted)
+
+    def cancel(self):
+        self._stop_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        self.join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.deleted
 
 
 class CLMDatabase:
-    def __init__(self, db_path):
+    def __init__(self, db_path, mode: str = 'rwc'):
+        if mode not in ('ro', 'rw', 'rwc'):
+            raise ValueError(f"Unknown database mode: {mode}")
         self.db_path = db_path
-        self._init_db()
+        self.mode = mode
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._writer = None
+        if mode == 'rwc':
+            self._init_db()
+        else:
+            self._check_schema()
+
+    def enable_write_behind(self, batch_size: int = 500, flush_interval: float = 0.05,
+                            synchronous: str = 'NORMAL'):
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = MessageWriter(self.db_path, batch_size, flush_interval, synchronous)
+        self._writer.start()
+        _active_writers.add(self._writer)
+        _install_exit_hooks()
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def _connect(self, drain: bool = False) -> sqlite3.Connection:
+        if drain and self._writer is not None:
+            self._writer.drain()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.mode == 'rwc':
+                conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            else:
+                uri = f"{Path(self.db_path).resolve().as_uri()}?mode={self.mode}"
+                conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def release_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close(self):
+        writer, self._writer = self._writer, None
+        try:
+            if writer is not None:
+                _active_writers.discard(writer)
+                writer.close()
+        finally:
+            with self._connections_lock:
+                for conn in self._connections:
+                    conn.close()
+                self._connections = []
+            self._local = threading.local()
 
     def _init_db(self):
         with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
             conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("PRAGMA foreign_keys=ON")
 
@@ -42,13 +317,60 @@ class CLMDatabase:
                     datetime TEXT NOT NULL,
                     created_at INTEGER DEFAULT (strftime('%s', 'now')),
                     is_deleted INTEGER DEFAULT 0,
+                    deleted_at INTEGER,
+                    row_hash INTEGER,
                     FOREIGN KEY (chat_id) REFERENCES chats (id) ON DELETE CASCADE
                 )
             ''')
 
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+            if 'deleted_at' not in columns:
+                conn.execute("ALTER TABLE messages ADD COLUMN deleted_at INTEGER")
+            conn.execute("UPDATE messages SET deleted_at = strftime('%s', 'now') "
+                         "WHERE is_deleted = 1 AND deleted_at IS NULL")
+            if 'row_hash' not in columns:
+                conn.execute("ALTER TABLE messages ADD COLUMN row_hash INTEGER")
+
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sync_buckets (
+                    chat_id TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    message_count INTEGER NOT NULL,
+                    hash_sum INTEGER NOT NULL,
+                    PRIMARY KEY (chat_id, bucket)
+                ) WITHOUT ROWID
+            ''')
+
             conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_chat_id ON messages(chat_id)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages(timestamp)')
             conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_deleted ON messages(is_deleted)')
+            conn.execute('DROP INDEX IF EXISTS idx_messages_chat_epoch')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_messages_chat_epoch_hash '
+                         'ON messages(chat_id, epoch_index, row_hash)')
+
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._rebuild_sync_buckets(conn)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_messages_sync_insert AFTER INSERT ON messages
+                BEGIN
+                    INSERT INTO sync_buckets (chat_id, bucket, message_count, hash_sum)
+                    VALUES (NEW.chat_id, NEW.epoch_index / {SYNC_BUCKET_SECONDS}, 1, COALESCE(NEW.row_hash, 0))
+                    ON CONFLICT (chat_id, bucket) DO UPDATE SET
+                        message_count = message_count + 1,
+                        hash_sum = hash_sum + excluded.hash_sum;
+                END
+            ''')
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_messages_sync_delete AFTER DELETE ON messages
+                BEGIN
+                    UPDATE sync_buckets SET
+                        message_count = message_count - 1,
+                        hash_sum = hash_sum - COALESCE(OLD.row_hash, 0)
+                    WHERE chat_id = OLD.chat_id AND bucket = OLD.epoch_index / {SYNC_BUCKET_SECONDS};
+                END
+            ''')
 
             if conn.execute("SELECT COUNT(*) FROM chats").fetchone()[0] == 0:
                 default_chats = [
@@ -60,46 +382,121 @@ class CLMDatabase:
 
             conn.commit()
 
+    def _check_schema(self):
+        try:
+            with self._connect() as conn:
+                tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            self.close()
+            raise ValueError(f"{self.db_path} is not a CLM database: {e}")
+
+        if not {'chats', 'messages', 'sync_buckets'} <= tables:
+            self.close()
+            raise ValueError(f"{self.db_path} is not a CLM database")
+        if version < SCHEMA_VERSION:
+            self.close()
+            raise ValueError(f"{self.db_path} uses an older CLM schema; open it with clm once to upgrade it")
+
+    def _rebuild_sync_buckets(self, conn, batch_size: int = 10000):
+        last_id = 0
+        while True:
+            rows = conn.execute("SELECT id, type, payload FROM messages WHERE id > ? AND row_hash IS NULL "
+                                "ORDER BY id LIMIT ?", (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            conn.executemany("UPDATE messages SET row_hash = ? WHERE id = ?",
+                             [(message_row_hash(msg_type, payload), msg_id) for msg_id, msg_type, payload in rows])
+            last_id = rows[-1][0]
+
+        conn.execute("DELETE FROM sync_buckets")
+        conn.execute(f'''
+            INSERT INTO sync_buckets (chat_id, bucket, message_count, hash_sum)
+            SELECT chat_id, epoch_index / {SYNC_BUCKET_SECONDS}, COUNT(*), SUM(row_hash)
+            FROM messages GROUP BY chat_id, epoch_index / {SYNC_BUCKET_SECONDS}
+        ''')
+
     def get_config(self) -> Dict[str, str]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT key, value FROM config")
             return {row[0]: row[1] for row in cursor.fetchall()}
 
     def set_config(self, key: str, value: str):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute("INSERT OR REPLACE INTO config VALUES (?, ?)", (key, value))
             conn.commit()
 
     def get_chats(self) -> Dict[str, Dict]:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT id, name, seed_suffix FROM chats ORDER BY id")
             return {row[0]: {"name": row[1], "seed_suffix": row[2]} for row in cursor.fetchall()}
 
+    def next_chat_id(self) -> str:
+        with self._connect() as conn:
+            return self._next_chat_id(conn)
+
+    def _next_chat_id(self, conn) -> str:
+        numeric_ids = [int(row[0]) for row in conn.execute("SELECT id FROM chats") if row[0].isdigit()]
+        return str(max(numeric_ids) + 1) if numeric_ids else '0'
+
+    def _resolve_chat(self, conn, chat_id: str, name: str, seed_suffix: str, stats: Dict[str, int]) -> str:
+        row = conn.execute("SELECT seed_suffix FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        if row is not None and row[0] == seed_suffix:
+            return chat_id
+
+        same_suffix = conn.execute("SELECT id FROM chats WHERE seed_suffix = ? ORDER BY id LIMIT 1",
+                                   (seed_suffix,)).fetchone()
+        if same_suffix is not None:
+            stats["remapped"] += 1
+            return same_suffix[0]
+
+        if row is not None:
+            chat_id = self._next_chat_id(conn)
+            stats["remapped"] += 1
+        conn.execute("INSERT INTO chats (id, name, seed_suffix) VALUES (?, ?, ?)", (chat_id, name, seed_suffix))
+        stats["chats"] += 1
+        return chat_id
+
     def add_chat(self, chat_id: str, name: str, seed_suffix: str):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute("INSERT INTO chats (id, name, seed_suffix) VALUES (?, ?, ?)", (chat_id, name, seed_suffix))
             conn.commit()
 
-    def delete_chat(self, chat_id: str):
-        with sqlite3.connect(self.db_path) as conn:
+    def resolve_chats(self, chats: Dict[str, Dict], stats: Dict[str, int]) -> Dict[str, str]:
+        with self._connect() as conn:
+            chat_ids = {chat_id: self._resolve_chat(conn, chat_id, chat["name"], chat["seed_suffix"], stats)
+                        for chat_id, chat in chats.items()}
+            conn.commit()
+        return chat_ids
+
+    def delete_chat(self, chat_id: str, batch_size: int = DELETE_BATCH_SIZE,
+                    progress: Optional[Callable[[int], None]] = None,
+                    stop_event: Optional[threading.Event] = None) -> int:
+        deleted = self.clear_chat_history(chat_id, batch_size, progress, stop_event)
+        if stop_event is not None and stop_event.is_set():
+            return deleted
+        with self._connect() as conn:
             conn.execute("DELETE FROM chats WHERE id = ?", (chat_id,))
             conn.commit()
+        return deleted
 
     def save_message(self, msg_type: str, chat_id: str, epoch_index: int, message: str, payload: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''
-                INSERT INTO messages (type, chat_id, epoch_index, message, payload, timestamp, datetime)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (msg_type, chat_id, epoch_index, message, payload, epoch_index,
-                  datetime.fromtimestamp(epoch_index).isoformat()))
+        row = (msg_type, chat_id, epoch_index, message, payload, epoch_index,
+               datetime.fromtimestamp(epoch_index).isoformat(), message_row_hash(msg_type, payload))
+        if self._writer is not None:
+            self._writer.put(row)
+            return
+
+        with self._connect() as conn:
+            conn.execute(INSERT_MESSAGE_SQL, row)
             conn.commit()
 
     def get_messages(self, chat_id: Optional[str] = None, limit: int = 0, include_deleted: bool = False) -> List[Dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connect(drain=True) as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
 
             query = "SELECT id, type, chat_id, epoch_index, message, payload, timestamp, is_deleted FROM messages"
             params = []
@@ -125,7 +522,7 @@ class CLMDatabase:
             return [dict(row) for row in cursor.fetchall()]
 
     def get_message_count(self, chat_id: Optional[str] = None, include_deleted: bool = False) -> int:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect(drain=True) as conn:
             cursor = conn.cursor()
 
             query = "SELECT COUNT(*) FROM messages"
@@ -146,21 +543,216 @@ class CLMDatabase:
             return cursor.fetchone()[0]
 
     def delete_message(self, message_id: int):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE messages SET is_deleted = 1 WHERE id = ?", (message_id,))
+        with self._connect() as conn:
+            conn.execute("UPDATE messages SET is_deleted = 1, deleted_at = strftime('%s', 'now') WHERE id = ?",
+                         (message_id,))
             conn.commit()
 
     def permanent_delete_message(self, message_id: int):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
             conn.commit()
 
     def restore_message(self, message_id: int):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE messages SET is_deleted = 0 WHERE id = ?", (message_id,))
+        with self._connect() as conn:
+            conn.execute("UPDATE messages SET is_deleted = 0, deleted_at = NULL WHERE id = ?", (message_id,))
             conn.commit()
 
-    def clear_chat_history(self, chat_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_id,))
+    def clear_chat_history(self, chat_id: str, batch_size: int = DELETE_BATCH_SIZE,
+                           progress: Optional[Callable[[int], None]] = None,
+                           stop_event: Optional[threading.Event] = None) -> int:
+        return self._delete_in_batches("chat_id = ?", (chat_id,), batch_size, progress, stop_event)
+
+    def purge_trash(self, older_than_days: Optional[float] = None, batch_size: int = DELETE_BATCH_SIZE,
+                    progress: Optional[Callable[[int], None]] = None,
+                    stop_event: Optional[threading.Event] = None) -> int:
+        if older_than_days is None:
+            return self._delete_in_batches("is_deleted = 1", (), batch_size, progress, stop_event)
+
+        cutoff = int(time.time() - older_than_days * 86400)
+        return self._delete_in_batches("is_deleted = 1 AND deleted_at < ?", (cutoff,),
+                                       batch_size, progress, stop_event)
+
+    def get_trash_retention_days(self) -> Optional[int]:
+        value = self.get_config().get('trash_retention_days')
+        return int(value) if value else None
+
+    def set_trash_retention_days(self, days: Optional[int]):
+        if days:
+            self.set_config('trash_retention_days', str(days))
+        else:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM config WHERE key = 'trash_retention_days'")
+                conn.commit()
+
+    def purge_expired_trash(self, **kwargs) -> int:
+        days = self.get_trash_retention_days()
+        if days is None:
+            return 0
+        return self.purge_trash(days, **kwargs)
+
+    def _delete_in_batches(self, where: str, params: tuple, batch_size: int,
+                           progress: Optional[Callable[[int], None]] = None,
+                           stop_event: Optional[threading.Event] = None) -> int:
+        deleted = 0
+        query = f"DELETE FROM messages WHERE id IN (SELECT id FROM messages WHERE {where} LIMIT ?)"
+        with self._connect(drain=True) as conn:
+            while stop_event is None or not stop_event.is_set():
+                cursor = conn.execute(query, params + (batch_size,))
+                conn.commit()
+                if cursor.rowcount <= 0:
+                    break
+                deleted += cursor.rowcount
+                if progress:
+                    progress(deleted)
+        return deleted
+
+    def is_incremental_vacuum_enabled(self) -> bool:
+        with self._connect() as conn:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def enable_incremental_vacuum(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.commit()
+            conn.execute("VACUUM")
+
+    def get_free_pages(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def incremental_vacuum(self, pages: int = 0) -> int:
+        before = self.get_free_pages()
+        with self._connect() as conn:
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})" if pages > 0 else "PRAGMA incremental_vacuum")
+        return before - self.get_free_pages()
+
+    def iter_messages(self, batch_size: int = 1000) -> Iterator[Dict]:
+        with self._connect(drain=True) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute('''
+                SELECT type, chat_id, epoch_index, message, payload, timestamp, created_at, is_deleted, deleted_at
+                FROM messages ORDER BY id
+            ''')
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+
+    def export_history(self, path, batch_size: int = 1000,
+                       progress: Optional[Callable[[int], None]] = None) -> int:
+        exported = 0
+        with open_history_file(path, 'w') as f:
+            f.write(json.dumps({"format": EXPORT_FORMAT, "version": EXPORT_VERSION}) + "\n")
+            for chat_id, chat in self.get_chats().items():
+                record = {"chat": {"id": chat_id, "name": chat["name"], "seed_suffix": chat["seed_suffix"]}}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            lines = []
+            for msg in self.iter_messages(batch_size):
+                lines.append(json.dumps({"message": msg}, ensure_ascii=False) + "\n")
+                if len(lines) >= batch_size:
+                    f.writelines(lines)
+                    exported += len(lines)
+                    lines = []
+                    if progress:
+                        progress(exported)
+            if lines:
+                f.writelines(lines)
+                exported += len(lines)
+                if progress:
+                    progress(exported)
+        return exported
+
+    def import_history(self, path, batch_size: int = 1000,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        stats = {"read": 0, "imported": 0, "skipped": 0, "chats": 0, "remapped": 0}
+        chat_ids = {}
+
+        self.flush()
+        with open_history_file(path, 'r') as f, self._connect() as conn:
+            header = json.loads(f.readline() or '{}')
+            if header.get("format") != EXPORT_FORMAT or header.get("version") != EXPORT_VERSION:
+                raise ValueError("Unsupported history file format")
+
+            batch = []
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "chat" in record:
+                    chat = record["chat"]
+                    chat_ids[chat["id"]] = self._resolve_chat(conn, chat["id"], chat["name"], chat["seed_suffix"],
+                                                              stats)
+                elif "message" in record:
+                    msg = record["message"]
+                    msg["chat_id"] = chat_ids.get(msg["chat_id"], msg["chat_id"])
+                    batch.append(msg)
+                    if len(batch) >= batch_size:
+                        self._import_batch(conn, batch, stats)
+                        batch = []
+                        if progress:
+                            progress(stats["read"], stats["imported"])
+            if batch:
+                self._import_batch(conn, batch, stats)
+                if progress:
+                    progress(stats["read"], stats["imported"])
             conn.commit()
+
+        return stats
+
+    def _insert_missing(self, conn, messages: List[Dict]) -> int:
+        cursor = conn.executemany('''
+            INSERT INTO messages (type, chat_id, epoch_index, message, payload, timestamp, datetime,
+                                  created_at, is_deleted, deleted_at, row_hash)
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CASE WHEN ? THEN strftime('%s', 'now') END), ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM messages WHERE chat_id = ? AND epoch_index = ? AND type = ? AND payload = ?
+            )
+        ''', [(msg['type'], msg['chat_id'], msg['epoch_index'], msg['message'], msg['payload'],
+               msg['timestamp'], datetime.fromtimestamp(msg['timestamp']).isoformat(),
+               msg.get('created_at'), msg.get('is_deleted', 0), msg.get('deleted_at'), msg.get('is_deleted', 0),
+               message_row_hash(msg['type'], msg['payload']),
+               msg['chat_id'], msg['epoch_index'], msg['type'], msg['payload']) for msg in messages])
+        conn.commit()
+        return cursor.rowcount
+
+    def insert_missing_messages(self, messages: List[Dict]) -> int:
+        with self._connect(drain=True) as conn:
+            return self._insert_missing(conn, messages)
+
+    def get_sync_digests(self) -> Dict[Tuple[str, int], Tuple[int, int]]:
+        with self._connect(drain=True) as conn:
+            rows = conn.execute("SELECT chat_id, bucket, message_count, hash_sum FROM sync_buckets "
+                                "WHERE message_count > 0")
+            return {(chat_id, bucket): (count, hash_sum) for chat_id, bucket, count, hash_sum in rows}
+
+    def get_bucket_keys(self, chat_id: str, bucket: int) -> List[Tuple[int, int]]:
+        start = bucket * SYNC_BUCKET_SECONDS
+        with self._connect(drain=True) as conn:
+            return conn.execute("SELECT epoch_index, row_hash FROM messages "
+                                "WHERE chat_id = ? AND epoch_index >= ? AND epoch_index < ?",
+                                (chat_id, start, start + SYNC_BUCKET_SECONDS)).fetchall()
+
+    def get_messages_by_keys(self, chat_id: str, keys: List[Tuple[int, int]]) -> List[Dict]:
+        messages = []
+        with self._connect(drain=True) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            for epoch_index, row_hash in keys:
+                cursor.execute('''
+                    SELECT type, chat_id, epoch_index, message, payload, timestamp, created_at, is_deleted,
+                           deleted_at
+                    FROM messages WHERE chat_id = ? AND epoch_index = ? AND row_hash = ?
+                ''', (chat_id, epoch_index, row_hash))
+                messages.extend(dict(row) for row in cursor.fetchall())
+        return messages
+
+    def _import_batch(self, conn, messages: List[Dict], stats: Dict[str, int]):
+        imported = self._insert_missing(conn, messages)
+        stats["read"] += len(messages)
+        stats["imported"] += imported
+        stats["skipped"] += len(messages) - imported
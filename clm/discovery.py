@@ -0,0 +1,130 @@
+# Copyright © 2025, Alexander Suvorov
+import codecs
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from .core import (CODEC_NONE, chat_keystream, decompress_message, encrypt_decrypt, message_decompressor,
+                   verify_pointer_tag)
+
+PREFIX_BYTES = 32
+EPOCHS_PER_TASK = 256
+PARALLEL_THRESHOLD = 4096
+
+_stop_event = None
+
+
+def plausible_prefix(data: bytes) -> bool:
+    try:
+        text = codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+    except UnicodeDecodeError:
+        return False
+    return not any(ch < ' ' and ch != '\t' for ch in text)
+
+
+def plausible_compressed_prefix(data: bytes, codec: int) -> bool:
+    try:
+        return plausible_prefix(message_decompressor(codec).decompress(data))
+    except (ValueError, zlib.error):
+        return False
+
+
+def try_decode(master_seed: str, seed_suffix: str, epoch_index: int, ciphertext: bytes,
+               codec: int = CODEC_NONE, tag: Optional[bytes] = None) -> Optional[str]:
+    if tag is not None and not verify_pointer_tag(tag, master_seed, seed_suffix, epoch_index, codec, ciphertext):
+        return None
+
+    drbg = chat_keystream(master_seed, seed_suffix, epoch_index)
+
+    prefix_len = min(PREFIX_BYTES, len(ciphertext))
+    prefix = encrypt_decrypt(ciphertext[:prefix_len], drbg.generate(prefix_len))
+    if tag is None:
+        if codec == CODEC_NONE:
+            plausible = plausible_prefix(prefix)
+        else:
+            plausible = plausible_compressed_prefix(prefix, codec)
+        if not plausible:
+            return None
+
+    rest = encrypt_decrypt(ciphertext[prefix_len:], drbg.generate(len(ciphertext) - prefix_len))
+    try:
+        signed_message = decompress_message(codec, prefix + rest).decode('utf-8')
+    except (UnicodeDecodeError, ValueError, zlib.error):
+        return None
+
+    if ": " not in signed_message:
+        return None
+    return signed_message
+
+
+def epoch_window(center: int, window: int) -> List[int]:
+    epochs = [center]
+    for offset in range(1, window + 1):
+        epochs.append(center - offset)
+        epochs.append(center + offset)
+    return epochs
+
+
+def scan(master_seed: str, ciphertext: bytes, chats: List[Tuple[str, str]], epochs: List[int],
+         codec: int = CODEC_NONE, tag: Optional[bytes] = None) -> Tuple[Optional[Tuple[str, int, str]], int]:
+    tried = 0
+    for epoch_index in epochs:
+        if _stop_event is not None and _stop_event.is_set():
+            break
+        for chat_id, seed_suffix in chats:
+            tried += 1
+            signed_message = try_decode(master_seed, seed_suffix, epoch_index, ciphertext, codec, tag)
+            if signed_message is not None:
+                if _stop_event is not None:
+                    _stop_event.set()
+                return (chat_id, epoch_index, signed_message), tried
+    return None, tried
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def discover(master_seed: str, ciphertext: bytes, chats: Dict[str, str], center: int, window: int,
+             workers: Optional[int] = None, codec: int = CODEC_NONE,
+             tag: Optional[bytes] = None) -> Tuple[Optional[Tuple[str, int, str]], Dict]:
+    chat_list = sorted(chats.items(), key=lambda x: x[0])
+    epochs = epoch_window(center, window)
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    tried = 0
+    found = None
+
+    if workers == 1 or len(epochs) * len(chat_list) < PARALLEL_THRESHOLD:
+        found, tried = scan(master_seed, ciphertext, chat_list, epochs, codec, tag)
+    else:
+        stop_event = multiprocessing.Event()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(stop_event,)) as executor:
+            futures = [executor.submit(scan, master_seed, ciphertext, chat_list,
+                                       epochs[i:i + EPOCHS_PER_TASK], codec, tag)
+                       for i in range(0, len(epochs), EPOCHS_PER_TASK)]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                result, count = future.result()
+                tried += count
+                if result is not None and found is None:
+                    found = result
+                    stop_event.set()
+                    for pending in futures:
+                        pending.cancel()
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "tried": tried,
+        "elapsed": elapsed,
+        "rate": tried / elapsed if elapsed > 0 else 0.0,
+        "workers": workers,
+    }
+    return found, stats
@@ -0,0 +1,103 @@
+# Copyright © 2025, Alexander Suvorov
+import hashlib
+import hmac
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Callable, Optional
+
+from .core import chat_keystream, encrypt_decrypt
+
+PAD_MAGIC = b'CLMPAD1\x00'
+PAD_HEADER = struct.Struct('>8sqII16s32s')
+DEFAULT_PAD_LENGTH = 256
+
+
+def _wrap_key(master_seed: str, seed_suffix: str, salt: bytes) -> bytes:
+    key_material = f"{master_seed}_{seed_suffix}".encode()
+    return hmac.new(key_material, b'clm-pad' + salt, hashlib.sha256).digest()
+
+
+def _check_tag(wrap_key: bytes, start_epoch: int, count: int, pad_length: int) -> bytes:
+    return hmac.new(wrap_key, struct.pack('>qII', start_epoch, count, pad_length), hashlib.sha256).digest()
+
+
+def _mask(wrap_key: bytes, epoch_index: int, length: int) -> bytes:
+    return hashlib.shake_256(wrap_key + struct.pack('>q', epoch_index)).digest(length)
+
+
+class KeystreamPads:
+    def __init__(self, path, master_seed: str, seed_suffix: str):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            header = self._file.read(PAD_HEADER.size)
+            if len(header) != PAD_HEADER.size:
+                raise ValueError("Truncated pad file")
+
+            magic, self.start_epoch, self.count, self.pad_length, salt, tag = PAD_HEADER.unpack(header)
+            if magic != PAD_MAGIC:
+                raise ValueError("Not a keystream pad file")
+
+            self._wrap_key = _wrap_key(master_seed, seed_suffix, salt)
+            if not hmac.compare_digest(tag, _check_tag(self._wrap_key, self.start_epoch,
+                                                       self.count, self.pad_length)):
+                raise ValueError("Pad file does not belong to this secret and chat")
+            if os.fstat(self._file.fileno()).st_size != PAD_HEADER.size + self.count * self.pad_length:
+                raise ValueError("Truncated pad file")
+
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)
+        except Exception:
+            self._file.close()
+            raise
+
+    @classmethod
+    def build(cls, path, master_seed: str, seed_suffix: str, start_epoch: int, end_epoch: int,
+              pad_length: int = DEFAULT_PAD_LENGTH, progress: Optional[Callable[[int, int], None]] = None):
+        count = end_epoch - start_epoch + 1
+        if count <= 0:
+            raise ValueError("End epoch must not be before start epoch")
+
+        salt = os.urandom(16)
+        wrap_key = _wrap_key(master_seed, seed_suffix, salt)
+        tag = _check_tag(wrap_key, start_epoch, count, pad_length)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+
+        with open(tmp_path, 'wb') as f:
+            f.write(PAD_HEADER.pack(PAD_MAGIC, start_epoch, count, pad_length, salt, tag))
+            chunk = []
+            for i in range(count):
+                epoch_index = start_epoch + i
+                key_bytes = chat_keystream(master_seed, seed_suffix, epoch_index).generate(pad_length)
+                chunk.append(encrypt_decrypt(key_bytes, _mask(wrap_key, epoch_index, pad_length)))
+                if len(chunk) >= 4096:
+                    f.write(b''.join(chunk))
+                    chunk = []
+                    if progress:
+                        progress(i + 1, count)
+            f.write(b''.join(chunk))
+            if progress:
+                progress(count, count)
+
+        os.replace(tmp_path, path)
+
+    def keystream(self, epoch_index: int, length: int) -> Optional[bytes]:
+        index = epoch_index - self.start_epoch
+        if not 0 <= index < self.count or length > self.pad_length:
+            return None
+
+        offset = PAD_HEADER.size + index * self.pad_length
+        pad = self._view[offset:offset + length]
+        if len(pad) != length:
+            return None
+        return encrypt_decrypt(pad, _mask(self._wrap_key, epoch_index, length))
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
@@ -0,0 +1,63 @@
+# Copyright © 2025, Alexander Suvorov
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_PROFILE = "default"
+PROFILE_NAME_RE = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def config_root() -> Path:
+    return Path.home() / ".config" / "clm"
+
+
+def profile_dir(name: Optional[str] = None, base_dir: Optional[Path] = None) -> Path:
+    base_dir = Path(base_dir) if base_dir else config_root()
+    if not name or name == DEFAULT_PROFILE:
+        return base_dir
+    if not PROFILE_NAME_RE.match(name) or name in ('.', '..'):
+        raise ValueError(f"Invalid profile name: {name}")
+    return base_dir / "profiles" / name
+
+
+def list_profiles(base_dir: Optional[Path] = None) -> List[str]:
+    base_dir = Path(base_dir) if base_dir else config_root()
+    profiles = [DEFAULT_PROFILE] if (base_dir / "clm.db").exists() else []
+    profiles_root = base_dir / "profiles"
+    if profiles_root.is_dir():
+        profiles += sorted(p.name for p in profiles_root.iterdir() if (p / "clm.db").exists())
+    return profiles
+
+
+class ProfileRouter:
+    def __init__(self, session_factory: Callable, base_dir: Optional[Path] = None):
+        self.session_factory = session_factory
+        self.base_dir = Path(base_dir) if base_dir else config_root()
+        self._sessions: Dict[str, object] = {}
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def session(self, name: Optional[str] = None):
+        name = name or DEFAULT_PROFILE
+        session = self._sessions.get(name)
+        if session is None:
+            with self._lock:
+                session_lock = self._session_locks.setdefault(name, threading.Lock())
+            with session_lock:
+                session = self._sessions.get(name)
+                if session is None:
+                    session = self.session_factory(profile_dir(name, self.base_dir))
+                    self._sessions[name] = session
+        return session
+
+    def profiles(self) -> List[str]:
+        return list_profiles(self.base_dir)
+
+    def close(self, name: Optional[str] = None):
+        with self._lock:
+            names = [name] if name is not None else list(self._sessions)
+            for profile in names:
+                session = self._sessions.pop(profile, None)
+                if session is not None:
+                    session.close()
@@ -0,0 +1,163 @@
+# Copyright © 2025, Alexander Suvorov
+import hashlib
+import hmac
+import json
+import os
+import struct
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, Optional
+
+from .core import POINTER_TAG_SIZE, chat_keystream, chat_seed_material, encrypt_decrypt
+
+STREAM_MAGIC = b'CLMS'
+STREAM_VERSION = 2
+DEFAULT_CHUNK_SIZE = 64 * 1024
+FRAME_HEADER = struct.Struct('>I')
+STREAM_MAC_SIZE = 16
+MAX_HEADER_SIZE = 4096
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def stream_seed_suffix(seed_suffix: str, nonce: str) -> str:
+    return f"{seed_suffix}_stream_{nonce}"
+
+
+def _stream_key(master_seed: str, seed_suffix: str, header: Dict) -> bytes:
+    return chat_seed_material(master_seed, stream_seed_suffix(seed_suffix, header['r']), header['e'])
+
+
+def _header_fields(header: Dict) -> bytes:
+    return json.dumps([header['v'], header['c'], header['e'], header['n'], header['r']]).encode('utf-8')
+
+
+def header_check(master_seed: str, seed_suffix: str, header: Dict) -> str:
+    mac = hmac.new(_stream_key(master_seed, seed_suffix, header), b'clm-stream-check' + _header_fields(header),
+                   hashlib.sha256)
+    return mac.digest()[:POINTER_TAG_SIZE].hex()
+
+
+def stream_mac(master_seed: str, seed_suffix: str, header: Dict):
+    return hmac.new(_stream_key(master_seed, seed_suffix, header), b'clm-stream-mac' + _header_fields(header),
+                    hashlib.sha256)
+
+
+def _authenticate(chunks: Iterable[bytes], mac) -> Iterator[bytes]:
+    for chunk in chunks:
+        mac.update(FRAME_HEADER.pack(len(chunk)) + chunk)
+        yield chunk
+
+
+def read_chunks(f: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def xor_chunks(chunks: Iterable[bytes], master_seed: str, seed_suffix: str, epoch_index: int,
+               nonce: str) -> Iterator[bytes]:
+    drbg = chat_keystream(master_seed, stream_seed_suffix(seed_suffix, nonce), epoch_index)
+    leftover = b''
+    for chunk in chunks:
+        needed = len(chunk) - len(leftover)
+        key_bytes = leftover + drbg.generate(-(-needed // 32) * 32) if needed > 0 else leftover
+        yield encrypt_decrypt(chunk, key_bytes)
+        leftover = key_bytes[len(chunk):]
+
+
+def new_header(chat_id: str, epoch_index: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"Chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes")
+    return {'v': STREAM_VERSION, 'c': chat_id, 'e': epoch_index, 'n': chunk_size, 'r': os.urandom(8).hex()}
+
+
+def write_container(dst: BinaryIO, header: Dict, ciphertext_chunks: Iterable[bytes],
+                    progress: Optional[Callable[[int], None]] = None) -> int:
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    dst.write(STREAM_MAGIC + FRAME_HEADER.pack(len(header_bytes)) + header_bytes)
+
+    total = 0
+    for chunk in ciphertext_chunks:
+        dst.write(FRAME_HEADER.pack(len(chunk)))
+        dst.write(chunk)
+        total += len(chunk)
+        if progress:
+            progress(total)
+    dst.write(FRAME_HEADER.pack(0))
+    return total
+
+
+def read_header(src: BinaryIO) -> Dict:
+    prefix = src.read(len(STREAM_MAGIC) + FRAME_HEADER.size)
+    if len(prefix) != len(STREAM_MAGIC) + FRAME_HEADER.size or not prefix.startswith(STREAM_MAGIC):
+        raise ValueError("Not a CLM stream container")
+
+    header_length, = FRAME_HEADER.unpack(prefix[len(STREAM_MAGIC):])
+    if header_length > MAX_HEADER_SIZE:
+        raise ValueError("Not a CLM stream container")
+
+    try:
+        header = json.loads(src.read(header_length).decode('utf-8'))
+    except ValueError:
+        raise ValueError("Not a CLM stream container")
+    if not isinstance(header, dict):
+        raise ValueError("Not a CLM stream container")
+    if header.get('v') != STREAM_VERSION:
+        raise ValueError("Unsupported stream container version")
+    if not (isinstance(header.get('c'), str) and _is_int(header.get('e')) and _is_int(header.get('n'))
+            and 0 < header['n'] <= MAX_CHUNK_SIZE and isinstance(header.get('r'), str)
+            and isinstance(header.get('k'), str)):
+        raise ValueError("Not a CLM stream container")
+    return header
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def read_frames(src: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    while True:
+        length_bytes = src.read(FRAME_HEADER.size)
+        if len(length_bytes) != FRAME_HEADER.size:
+            raise ValueError("Truncated stream container")
+
+        length, = FRAME_HEADER.unpack(length_bytes)
+        if length == 0:
+            break
+        if length > chunk_size:
+            raise ValueError("Corrupted stream container")
+
+        chunk = src.read(length)
+        if len(chunk) != length:
+            raise ValueError("Truncated stream container")
+        yield chunk
+
+
+def encrypt_file(src: BinaryIO, dst: BinaryIO, master_seed: str, seed_suffix: str, header: Dict,
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+    header['k'] = header_check(master_seed, seed_suffix, header)
+    mac = stream_mac(master_seed, seed_suffix, header)
+    chunks = read_chunks(src, header['n'])
+    ciphertext = xor_chunks(chunks, master_seed, seed_suffix, header['e'], header['r'])
+    total = write_container(dst, header, _authenticate(ciphertext, mac), progress)
+    dst.write(mac.digest()[:STREAM_MAC_SIZE])
+    return total
+
+
+def decrypt_file(src: BinaryIO, dst: BinaryIO, master_seed: str, seed_suffix: str, header: Dict,
+                 progress: Optional[Callable[[int], None]] = None) -> int:
+    if not hmac.compare_digest(str(header.get('k', '')), header_check(master_seed, seed_suffix, header)):
+        raise ValueError("Container does not belong to this secret and chat")
+
+    total = 0
+    mac = stream_mac(master_seed, seed_suffix, header)
+    frames = _authenticate(read_frames(src, header['n']), mac)
+    for chunk in xor_chunks(frames, master_seed, seed_suffix, header['e'], header['r']):
+        dst.write(chunk)
+        total += len(chunk)
+        if progress:
+            progress(total)
+
+    if not hmac.compare_digest(src.read(STREAM_MAC_SIZE), mac.digest()[:STREAM_MAC_SIZE]):
+        raise ValueError("Container is corrupted or truncated")
+    return total
@@ -0,0 +1,59 @@
+# Copyright © 2025, Alexander Suvorov
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .database import CLMDatabase
+
+MERGE_BATCH_SIZE = 1000
+
+
+def diff_buckets(target: CLMDatabase, source: CLMDatabase, chat_ids: Dict[str, str]) -> List[Tuple[str, int]]:
+    target_digests = target.get_sync_digests()
+    source_digests = source.get_sync_digests()
+    return sorted((chat_id, bucket) for (chat_id, bucket), digest in source_digests.items()
+                  if target_digests.get((chat_ids.get(chat_id, chat_id), bucket)) != digest)
+
+
+def missing_keys(target: CLMDatabase, source: CLMDatabase, source_chat_id: str, target_chat_id: str,
+                 bucket: int) -> List[Tuple[int, int]]:
+    missing = set(source.get_bucket_keys(source_chat_id, bucket))
+    missing.difference_update(target.get_bucket_keys(target_chat_id, bucket))
+    return sorted(missing)
+
+
+def merge_databases(target: CLMDatabase, source: CLMDatabase, batch_size: int = MERGE_BATCH_SIZE,
+                    progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    started = time.perf_counter()
+    target.flush()
+    source.flush()
+
+    stats = {"chats": 0, "remapped": 0, "buckets": 0, "transferred": 0, "imported": 0, "skipped": 0}
+    chat_ids = target.resolve_chats(source.get_chats(), stats)
+
+    batch = []
+    for chat_id, bucket in diff_buckets(target, source, chat_ids):
+        stats["buckets"] += 1
+        target_chat_id = chat_ids.get(chat_id, chat_id)
+        keys = missing_keys(target, source, chat_id, target_chat_id, bucket)
+        for i in range(0, len(keys), batch_size):
+            for msg in source.get_messages_by_keys(chat_id, keys[i:i + batch_size]):
+                msg["chat_id"] = target_chat_id
+                batch.append(msg)
+            if len(batch) >= batch_size:
+                _flush_batch(target, batch, stats, progress)
+                batch = []
+    if batch:
+        _flush_batch(target, batch, stats, progress)
+
+    stats["elapsed"] = time.perf_counter() - started
+    return stats
+
+
+def _flush_batch(target: CLMDatabase, batch: List[Dict], stats: Dict,
+                 progress: Optional[Callable[[int, int], None]]):
+    imported = target.insert_missing_messages(batch)
+    stats["transferred"] += len(batch)
+    stats["imported"] += imported
+    stats["skipped"] += len(batch) - imported
+    if progress:
+        progress(stats["transferred"], stats["imported"])